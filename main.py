@@ -2,7 +2,7 @@
 Todo List Manager MCP Server
 ----------------------------
 Proof-of-concept MCP server that manages a simple todo list stored
-in a YAML file on the local system.
+in a JSON file on the local system.
 
 Features:
 - List todos
@@ -12,52 +12,129 @@ Features:
 - Fetch current system timestamp (independent utility)
 
 Requirements:
-    pip install mcp ruamel.yaml
+    pip install mcp orjson ruamel.yaml
 """
 
 import os
-import uuid
+import asyncio
+import atexit
+import contextlib
+import copy
+import fcntl
+import hashlib
+import mmap
+import secrets
 import tempfile
+import threading
 import logging
 import sys
+import time
+from contextvars import ContextVar
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional
 
 from mcp.server import Server
+from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
-import json
-from ruamel.yaml import YAML
+import orjson
 
 # ----------------------------------------------------------------------
 # Configuration
 # ----------------------------------------------------------------------
 
 # Default location for storing todos (customizable via TODO_FILE environment variable)
-TODO_FILE = Path(os.getenv("TODO_FILE", str(Path.home() / ".todos.yaml"))).expanduser()
-
-# Initialize YAML parser/writer
-yaml = YAML()
-yaml.indent(mapping=2, sequence=4, offset=2)
-yaml.default_flow_style = False
+TODO_FILE = Path(os.getenv("TODO_FILE", str(Path.home() / ".todos.json"))).expanduser()
 
 # Configure logging
 logger = logging.getLogger("todo-mcp-server")
 
+# Whether DEBUG records are emitted, refreshed by setup_logging(). Per-request
+# code checks this flag before building debug messages.
+_DEBUG = False
+
+# In-memory todo state for TODO_FILE: the parsed snapshot plus any
+# replayed journal entries, reused while the snapshot's (mtime, size) key
+# and the journal's (device, inode, size) key are unchanged; either key is
+# None while its file does not exist. When only the journal grew, e.g.
+# through another server instance sharing TODO_FILE, just the new entries
+# are replayed.
+# "todos" maps todo IDs to items in insertion order (the on-disk format
+# stays a {"todos": [...]} list); "list_json" is a (todos, text) pair
+# holding the rendered list_todos response for that todos dict, None until
+# requested; "digest" is the BLAKE2b hash of the snapshot bytes last read
+# or written.
+#
+# A published "todos" dict and its items are never mutated: writers build
+# a new dict under _write_lock and rebind it, so readers can use whatever
+# dict they fetched without locking.
+_cache = {
+    "path": None,
+    "key": None,
+    "journal": None,
+    "todos": None,
+    "list_json": None,
+    "digest": None,
+    "journal_entries": 0,
+}
+
+# State of an in-memory backend active in the current context, or None to
+# use the JSON files at TODO_FILE; see memory_backend(). It has the same
+# "todos", "list_json" and "journal_entries" entries as _cache.
+_memory_state: ContextVar[Optional[dict]] = ContextVar("todo_memory_state", default=None)
+
+# Serializes mutations, reloads and file writes. Reentrant because writes
+# nest, e.g. an append that triggers compaction.
+_write_lock = threading.RLock()
+
+# Snapshots at least this large are parsed from a memory map instead of
+# being read into a bytes object first
+MMAP_MIN_SIZE = 1 << 20
+
+# Compact the journal into a fresh snapshot once it holds at least this many
+# entries and at least as many as there are live todos, i.e. once most of
+# the records on disk have been superseded. Rewrites then stay amortized
+# O(1) per mutation however large the todo list grows.
+JOURNAL_COMPACT_THRESHOLD = 100
+
+# While the server runs, journal fsyncs are coalesced over this many seconds
+JOURNAL_FLUSH_DELAY = 0.1
+_journal_flush_event: Optional[asyncio.Event] = None
+_journal_flush_loop: Optional[asyncio.AbstractEventLoop] = None
+_journal_dirty = False
+
+# Journal file descriptor kept open across appends, so a burst of
+# mutations shares one open file and a single fsync on flush; "locks" is
+# the nesting depth of _journal_lock() blocks holding its flock
+_journal_handle = {"path": None, "fd": None, "locks": 0, "locked": False}
+
+# (second, formatted timestamp) last produced by current_timestamp(); an
+# immutable pair rebound in one assignment, so threads never see a second
+# paired with another second's text
+_ts_cache = (None, "")
+
 
 def setup_logging():
     """Setup logging configuration with default debug logging and file output."""
+    global _DEBUG
     # Default to DEBUG level for better troubleshooting
     log_level = os.getenv("LOG_LEVEL", "DEBUG").upper()
     log_format = os.getenv("LOG_FORMAT", "%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s")
     
     # Configure the logger
     logger.setLevel(getattr(logging, log_level, logging.DEBUG))
+    formatter = logging.Formatter(log_format)
+    
+    # Replace handlers from an earlier call instead of stacking new ones
+    for handler in [h for h in logger.handlers if getattr(h, "_todo_mcp", False)]:
+        logger.removeHandler(handler)
+        handler.close()
     
     # Create console handler if not already present
     if not logger.handlers:
         handler = logging.StreamHandler(sys.stderr)
-        handler.setFormatter(logging.Formatter(log_format))
+        handler.setFormatter(formatter)
+        handler._todo_mcp = True
         logger.addHandler(handler)
     
     # Default log file location
@@ -69,88 +146,692 @@ def setup_logging():
             # Ensure log file directory exists
             Path(log_file).parent.mkdir(parents=True, exist_ok=True)
             file_handler = logging.FileHandler(log_file)
-            file_handler.setFormatter(logging.Formatter(log_format))
+            file_handler.setFormatter(formatter)
+            file_handler._todo_mcp = True
             logger.addHandler(file_handler)
         except Exception as e:
-            logger.error(f"Failed to setup file logging to {log_file}: {e}")
+            logger.error("Failed to setup file logging to %s: %s", log_file, e)
     
-    logger.info(f"Logging configured: level={log_level}, file={log_file}")
-    logger.debug(f"Todo file location: {TODO_FILE}")
-    logger.debug(f"Todo file exists: {TODO_FILE.exists()}")
+    _DEBUG = logger.isEnabledFor(logging.DEBUG)
+    logger.info("Logging configured: level=%s, file=%s", log_level, log_file)
+    logger.debug("Todo file location: %s", TODO_FILE)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Todo file exists: %s", TODO_FILE.exists())
 
 # ----------------------------------------------------------------------
 # Helper Functions
 # ----------------------------------------------------------------------
 
-def load_todos() -> dict:
-    """Load todos from YAML file. Returns dict structure.
-    If file does not exist, initialize with empty todos list."""
-    logger.debug(f"Loading todos from {TODO_FILE}")
-    
-    if not TODO_FILE.exists():
-        logger.debug("Todo file doesn't exist, returning empty list")
-        return {"todos": []}
+def _json_default(obj):
+    """Serialize values orjson does not handle natively, such as the
+    timestamp objects produced when parsing unquoted YAML dates."""
+    if isinstance(obj, datetime):
+        return obj.isoformat(timespec="seconds")
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _legacy_yaml_loader():
+    """Return a safe YAML loader for legacy todo files. ruamel.yaml is
+    imported here so it is only loaded when there is something to migrate.
+    The safe loader never constructs arbitrary Python objects and parses
+    in C via libyaml when ruamel.yaml.clib is installed."""
+    from ruamel.yaml import YAML
+    return YAML(typ="safe", pure=False)
+
+
+def _is_todo_data(data) -> bool:
+    """Check that parsed file content is todo data, i.e. a mapping with a
+    "todos" list. Anything else is some unrelated file that must be left
+    alone rather than overwritten."""
+    return isinstance(data, dict) and isinstance(data.get("todos"), list)
+
+
+def _parse_legacy_yaml(raw: bytes) -> dict:
+    """Parse legacy YAML todo data into plain JSON-compatible types."""
+    data = _legacy_yaml_loader().load(raw)
+    if data is None:
+        data = {"todos": []}
+
+    # Normalize YAML-native values (e.g. timestamps) to plain JSON types
+    return orjson.loads(orjson.dumps(data, default=_json_default))
+
+
+def migrate_legacy_yaml() -> bool:
+    """One-time migration of a legacy YAML todo file next to TODO_FILE.
+    Returns True if a legacy file was found and converted to JSON.
+
+    Runs under its own journal lock and only while TODO_FILE is still
+    missing once the lock is held, so instances starting together migrate
+    once; entries already journaled are kept. Must not be called while a
+    mutation holds the journal lock, as the migration removes the journal."""
+    legacy_file = TODO_FILE.with_suffix(".yaml")
+    if legacy_file == TODO_FILE or not legacy_file.exists():
+        return False
+
+    with _journal_lock() as fd:
+        if _snapshot_key() is not None:
+            return False
+        try:
+            raw = legacy_file.read_bytes()
+        except FileNotFoundError:
+            return False
+        data = _parse_legacy_yaml(raw)
+        if not _is_todo_data(data):
+            logger.warning("Not migrating %s: it does not contain a todos list", legacy_file)
+            return False
+        logger.info("Migrating legacy YAML todos from %s to %s", legacy_file, TODO_FILE)
+        todos = _build_index(data)
+        if fd is not None:
+            _replay_journal(todos, fd)
+        save_todos({"todos": list(todos.values())})
+        logger.info("Migrated %d todos to %s", len(todos), TODO_FILE)
+        return True
+
+
+def journal_file() -> Path:
+    """Return the append-only journal that records mutations made since
+    TODO_FILE was last written."""
+    return TODO_FILE.with_suffix(".journal")
+
+
+def _apply_journal_entry(todos: dict, entry: dict) -> None:
+    """Apply one journal entry to the ID-keyed todos. Entries are idempotent
+    so a journal that was already folded into the snapshot can be replayed."""
+    op = entry.get("op")
+    if op == "add":
+        todo = entry["todo"]
+        todos.setdefault(todo["id"], todo)
+    elif op == "complete":
+        item = todos.get(entry["id"])
+        if item is not None:
+            # Replace rather than update the item, which may be shared
+            # with a published todos dict
+            todos[entry["id"]] = {**item, "status": "done",
+                                  "completed_at": entry["completed_at"]}
+    elif op == "delete":
+        todos.pop(entry["id"], None)
+    else:
+        logger.warning("Ignoring unknown journal operation: %r", op)
+
+
+def _replay_journal(todos: dict, fd: int, offset: int = 0) -> int:
+    """Replay the entries of the open journal fd from byte offset onwards
+    on top of todos. Returns entry count."""
+    lines = os.pread(fd, os.fstat(fd).st_size - offset, offset).splitlines()
+
+    count = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            entry = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            # A torn final write from a crash; everything before it is intact
+            logger.warning("Skipping unreadable journal entry in %s", journal_file())
+            continue
+        _apply_journal_entry(todos, entry)
+        count += 1
+    logger.debug("Replayed %d journal entries", count)
+    return count
+
+
+def _build_index(data: dict) -> dict:
+    """Key the todo list of snapshot data by ID, keeping its order."""
+    return {t["id"]: t for t in data["todos"]}
+
+
+def _file_key(st: os.stat_result) -> tuple:
+    """Cache key identifying one version of TODO_FILE."""
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _journal_key(st: os.stat_result) -> tuple:
+    """Cache key identifying one journal file and how much of it was read.
+    The journal only grows until it is replaced, so the size is enough."""
+    return (st.st_dev, st.st_ino, st.st_size)
+
 
-    with open(TODO_FILE, "r", encoding="utf-8") as f:
-        data = yaml.load(f)
+def _update_cache(key: Optional[tuple], todos: dict, journal_entries: int = 0,
+                  digest: Optional[bytes] = None, journal: Optional[tuple] = None) -> None:
+    """Remember todo state for the current TODO_FILE and file keys. The
+    todos are published before the keys and path that lock-free readers
+    check, so a reader that sees the new keys also sees the new todos."""
+    _cache["todos"] = todos
+    _cache["key"] = key
+    _cache["journal"] = journal
+    _cache["path"] = TODO_FILE
+    _cache["list_json"] = None
+    _cache["digest"] = digest
+    _cache["journal_entries"] = journal_entries
+
+
+def _parse_snapshot(buf) -> Optional[dict]:
+    """Parse snapshot bytes; a blank file yields None. Content that is not
+    JSON but is legacy YAML todo data is accepted too, so a TODO_FILE that
+    still holds YAML (e.g. one configured as ~/my-todos.yaml) keeps
+    working. The next save rewrites it as JSON, which YAML readers accept."""
+    try:
+        return orjson.loads(buf)
+    except orjson.JSONDecodeError:
+        raw = bytes(buf)
+        if not raw.strip():
+            return None
+        data = _parse_yaml_snapshot(raw)
         if data is None:
-            logger.debug("Todo file is empty, returning empty list")
-            return {"todos": []}
-        
-        todo_count = len(data.get("todos", []))
-        logger.debug(f"Loaded {todo_count} todos from file")
+            raise
         return data
 
 
+def _parse_yaml_snapshot(raw: bytes) -> Optional[dict]:
+    """Parse raw as legacy YAML todo data, or return None if it is not."""
+    from ruamel.yaml.error import YAMLError
+    try:
+        data = _parse_legacy_yaml(raw)
+    except (YAMLError, TypeError):
+        return None
+    if not _is_todo_data(data):
+        return None
+    logger.info("Reading legacy YAML todos from %s; it is rewritten as JSON on next save", TODO_FILE)
+    return data
+
+
+def _read_snapshot() -> tuple:
+    """Read and parse TODO_FILE, returning the data and the BLAKE2b digest
+    of the file's bytes. Typical small files are read in a single call;
+    large ones are handed to orjson as a read-only memory map of the page
+    cache rather than copied into a Python buffer."""
+    data = None
+    digest = hashlib.blake2b()
+    fd = os.open(TODO_FILE, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        if size >= MMAP_MIN_SIZE:
+            with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as mm, memoryview(mm) as buf:
+                digest.update(buf)
+                data = _parse_snapshot(buf)
+        elif size:
+            with open(fd, "rb", buffering=0, closefd=False) as f:
+                raw = f.readall()
+            digest.update(raw)
+            data = _parse_snapshot(raw)
+    finally:
+        os.close(fd)
+    if data is None:
+        logger.debug("Todo file is empty, returning empty list")
+        return {"todos": []}, digest.digest()
+    if not _is_todo_data(data):
+        raise ValueError(f"{TODO_FILE} does not contain todo data (no \"todos\" list)")
+    logger.debug("Loaded %d todos from file", len(data['todos']))
+    return data, digest.digest()
+
+
+def _snapshot_key() -> Optional[tuple]:
+    """Return the cache key of TODO_FILE, or None if it does not exist."""
+    try:
+        return _file_key(TODO_FILE.stat())
+    except FileNotFoundError:
+        return None
+
+
+def _current_journal_key() -> Optional[tuple]:
+    """Return the cache key of the journal, or None if it does not exist."""
+    try:
+        return _journal_key(os.stat(journal_file()))
+    except FileNotFoundError:
+        return None
+
+
+def _state() -> dict:
+    """Return the state of the active backend."""
+    memory = _memory_state.get()
+    return _cache if memory is None else memory
+
+
+@contextlib.contextmanager
+def memory_backend(todos: Optional[List[dict]] = None):
+    """Keep todos in memory instead of TODO_FILE for the current context,
+    starting from a copy of todos. Nothing is read from or written to
+    disk inside the block; worker threads started with asyncio.to_thread
+    inherit the backend."""
+    token = _memory_state.set({
+        "todos": _build_index({"todos": copy.deepcopy(todos or [])}),
+        "list_json": None,
+        "journal_entries": 0,
+    })
+    try:
+        yield
+    finally:
+        _memory_state.reset(token)
+
+
+def _load_state() -> dict:
+    """Return the current in-memory todos keyed by ID, loading the snapshot
+    and replaying the journal only when TODO_FILE changed since last time.
+    The result must not be mutated; see _publish."""
+    memory = _memory_state.get()
+    if memory is not None:
+        return memory["todos"]
+    if (_cache["path"] == TODO_FILE and _cache["key"] == _snapshot_key()
+            and _cache["journal"] == _current_journal_key()):
+        return _cache["todos"]
+
+    with _write_lock:
+        if _journal_handle["locks"]:
+            # Mutators load the state (and so migrate) before locking
+            return _sync_state(_journal_handle["fd"])
+        if _snapshot_key() is None:
+            migrate_legacy_yaml()
+        with _journal_shared_lock() as fd:
+            return _sync_state(fd)
+
+
+def _sync_state(fd: Optional[int]) -> dict:
+    """Bring the cached todos up to date with the snapshot and the locked
+    journal fd (None if there is no journal). While the snapshot is
+    unchanged, only journal entries appended since the last sync are
+    replayed; otherwise everything is reloaded."""
+    key = _snapshot_key()
+    journal = _journal_key(os.fstat(fd)) if fd is not None else None
+    seen = _cache["journal"]
+    # Another thread may have synced while this one waited
+    if _cache["path"] == TODO_FILE and _cache["key"] == key:
+        if seen == journal:
+            return _cache["todos"]
+        if journal is not None and (seen is None or (seen[:2] == journal[:2]
+                                                     and seen[2] <= journal[2])):
+            offset = 0 if seen is None else seen[2]
+            todos = dict(_cache["todos"])
+            count = _replay_journal(todos, fd, offset)
+            _cache["todos"] = todos
+            _cache["journal"] = journal
+            _cache["journal_entries"] += count
+            return todos
+    return _reload_state(key, fd, journal)
+
+
+def _reload_state(key: Optional[tuple], fd: Optional[int],
+                  journal: Optional[tuple]) -> dict:
+    """Rebuild the cached todos from the snapshot and the journal fd."""
+    digest = None
+    if key is None:
+        logger.debug("Todo file doesn't exist, starting with empty list")
+        todos = {}
+    else:
+        data, digest = _read_snapshot()
+        todos = _build_index(data)
+    journal_entries = _replay_journal(todos, fd) if fd is not None else 0
+    # Seeding the digest from the bytes just read lets a save that would
+    # rewrite the same snapshot be skipped, even right after a restart
+    _update_cache(key, todos, journal_entries, digest, journal)
+    return todos
+
+
+def load_todos() -> dict:
+    """Load todos from JSON file. Returns dict structure.
+    If file does not exist, initialize with empty todos list.
+    Parsed data is cached and reused until the file's mtime or size changes;
+    callers always receive their own copy."""
+    logger.debug("Loading todos from %s", TODO_FILE)
+    return {"todos": copy.deepcopy(list(_load_state().values()))}
+
+
+def _publish(todos: dict) -> None:
+    """Make a modified copy of the todos the current state. Must be called
+    inside _journal_lock(), followed by _append_journal for the change."""
+    _state()["todos"] = todos
+
+
+def _journal_fd() -> int:
+    """Return the open journal descriptor for the current TODO_FILE,
+    opening (and if necessary creating) the journal on first use and
+    whenever the file at the journal path is no longer the one held open.
+    Inside _journal_lock() a reopened journal is locked before returning."""
+    path = journal_file()
+    while _journal_handle["path"] != path or not _is_file_at(_journal_handle["fd"], path):
+        _close_journal()
+        flags = os.O_RDWR | os.O_APPEND | os.O_CREAT
+        try:
+            fd = os.open(path, flags, 0o600)
+        except FileNotFoundError:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(path, flags, 0o600)
+        _journal_handle["path"] = path
+        _journal_handle["fd"] = fd
+        if _journal_handle["locks"]:
+            # The loop re-checks it was not compacted away while waiting
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            _journal_handle["locked"] = True
+    return _journal_handle["fd"]
+
+
+def _is_file_at(fd: int, path: Path) -> bool:
+    """Check that fd still refers to the file at path, i.e. it was not
+    unlinked or replaced (by another instance's compaction, a cleanup or a
+    backup rotation) since it was opened. Appending to a stale journal
+    descriptor would write to a deleted inode."""
+    held = os.fstat(fd)
+    try:
+        current = os.stat(path)
+    except FileNotFoundError:
+        return False
+    return (held.st_dev, held.st_ino) == (current.st_dev, current.st_ino)
+
+
+@contextlib.contextmanager
+def _journal_lock():
+    """Hold _write_lock and an exclusive flock on the journal, creating it
+    if needed, so that server instances sharing TODO_FILE catch up, append
+    and compact one at a time. Reentrant within this process. Yields the
+    locked journal descriptor, or None for the in-memory backend."""
+    with _write_lock:
+        if _memory_state.get() is not None:
+            yield None
+            return
+        if _journal_handle["locks"]:
+            _journal_handle["locks"] += 1
+            try:
+                yield _journal_handle["fd"]
+            finally:
+                _journal_handle["locks"] -= 1
+            return
+
+        _journal_handle["locks"] = 1
+        try:
+            fd = _journal_fd()
+            if not _journal_handle["locked"]:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                _journal_handle["locked"] = True
+                # Reopens (and locks) the journal if another instance
+                # compacted it away while we were waiting for the lock
+                fd = _journal_fd()
+            yield fd
+        finally:
+            _journal_handle["locks"] = 0
+            # Compaction closes the descriptor, which already released it
+            if _journal_handle["locked"]:
+                _journal_handle["locked"] = False
+                fcntl.flock(_journal_handle["fd"], fcntl.LOCK_UN)
+
+
+@contextlib.contextmanager
+def _journal_shared_lock():
+    """Hold a shared flock on the journal while reading it, so entries are
+    never read half-written or while another instance compacts. Yields a
+    read-only descriptor, or None if there is no journal."""
+    path = journal_file()
+    while True:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            yield None
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            if _is_file_at(fd, path):
+                yield fd
+                return
+        finally:
+            os.close(fd)
+
+
+def _close_journal() -> None:
+    """Flush and close the open journal descriptor, if any."""
+    fd = _journal_handle["fd"]
+    if fd is None:
+        return
+    try:
+        flush_journal()
+    finally:
+        _journal_handle["path"] = None
+        _journal_handle["fd"] = None
+        _journal_handle["locked"] = False
+        os.close(fd)
+
+
+def _append_journal(entry: dict) -> None:
+    """Append one mutation to the journal, compacting it into a new
+    snapshot once it outgrows both JOURNAL_COMPACT_THRESHOLD and the
+    number of live todos. Must be called inside _journal_lock().
+    The fsync is deferred to the background flusher when one is running,
+    otherwise it happens before returning."""
+    global _journal_dirty
+    if _memory_state.get() is not None:
+        return
+    path = journal_file()
+    flush_event, flush_loop = _journal_flush_event, _journal_flush_loop
+    if _DEBUG:
+        logger.debug("Appending %s entry to %s", entry['op'], path)
+    try:
+        fd = _journal_fd()
+        record = orjson.dumps(entry) + b"\n"
+        st = os.fstat(fd)
+        if st.st_size and os.pread(fd, 1, st.st_size - 1) != b"\n":
+            # Terminate a torn final line left by a crash, so this entry
+            # does not become part of it
+            record = b"\n" + record
+        os.write(fd, record)
+        if flush_event is None:
+            os.fsync(fd)
+    except Exception:
+        logger.error("Failed to append to journal %s", path)
+        # The in-memory state is ahead of disk now; reload it on next access
+        # and reopen the journal on the next append
+        _cache["path"] = None
+        fd = _journal_handle["fd"]
+        _journal_handle["path"] = _journal_handle["fd"] = None
+        _journal_handle["locked"] = False
+        if fd is not None:
+            with contextlib.suppress(OSError):
+                os.close(fd)
+        raise
+
+    if flush_event is not None:
+        _journal_dirty = True
+        # Appends run in worker threads and asyncio.Event is not thread-safe.
+        # If the loop is already gone, the exit-time flush covers this entry.
+        with contextlib.suppress(RuntimeError):
+            flush_loop.call_soon_threadsafe(flush_event.set)
+
+    _cache["list_json"] = None
+    _cache["journal"] = (st.st_dev, st.st_ino, st.st_size + len(record))
+    _cache["journal_entries"] += 1
+    entries = _cache["journal_entries"]
+    if entries >= JOURNAL_COMPACT_THRESHOLD and entries >= len(_cache["todos"]):
+        logger.debug("Journal reached %d entries, compacting", _cache['journal_entries'])
+        _compact()
+
+
+def _compact() -> None:
+    """Fold the journal into a fresh snapshot of the in-memory todos."""
+    todos = _cache["todos"]
+    _save_snapshot({"todos": list(todos.values())}, todos)
+
+
+def flush_journal() -> None:
+    """fsync journal entries appended since the last flush."""
+    global _journal_dirty
+    with _write_lock:
+        if not _journal_dirty:
+            return
+        _journal_dirty = False
+        fd = _journal_handle["fd"]
+        if fd is None:
+            # Compacted in the meantime; save_todos already fsynced the snapshot
+            return
+        os.fsync(fd)
+        logger.debug("Flushed journal %s", _journal_handle["path"])
+
+
+async def _journal_flusher(event: asyncio.Event) -> None:
+    """Background task that fsyncs the journal once per burst of writes."""
+    while True:
+        await event.wait()
+        await asyncio.sleep(JOURNAL_FLUSH_DELAY)
+        event.clear()
+        try:
+            await asyncio.to_thread(flush_journal)
+        except Exception as e:
+            logger.error("Failed to flush journal: %s", e)
+
+
+@contextlib.asynccontextmanager
+async def deferred_journal_flush():
+    """Batch journal fsyncs in a background task for the duration of the
+    block, with a final flush on exit."""
+    global _journal_flush_event, _journal_flush_loop
+    _journal_flush_loop = asyncio.get_running_loop()
+    _journal_flush_event = asyncio.Event()
+    flusher = asyncio.create_task(_journal_flusher(_journal_flush_event))
+    try:
+        yield
+    finally:
+        flusher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await flusher
+        _journal_flush_event = _journal_flush_loop = None
+        flush_journal()
+
+
+def _remove_journal() -> None:
+    """Delete the journal once a snapshot includes all of its entries. It
+    is unlinked before its descriptor is closed, releasing the lock, so
+    another instance can never append to it in between."""
+    global _journal_dirty
+    try:
+        os.unlink(journal_file())
+        logger.debug("Removed compacted journal %s", journal_file())
+    except FileNotFoundError:
+        pass
+    if _journal_handle["path"] == journal_file():
+        # Nothing left to make durable; the snapshot supersedes it
+        _journal_dirty = False
+        _close_journal()
+
+
+def _cache_saved(key: tuple, data: dict, digest: bytes, todos: Optional[dict]) -> None:
+    """Make just-saved data the cached state. todos is the in-memory state
+    the data was rendered from, or None to cache a copy of caller data."""
+    if todos is None:
+        todos = _build_index(copy.deepcopy(data))
+    _update_cache(key, todos, digest=digest)
+
+
+def _snapshot_unchanged(digest: bytes) -> bool:
+    """Check whether TODO_FILE still holds exactly the bytes hashing to
+    digest that this process last read or wrote."""
+    if _cache["path"] != TODO_FILE or _cache["digest"] != digest:
+        return False
+    try:
+        return _file_key(TODO_FILE.stat()) == _cache["key"]
+    except FileNotFoundError:
+        return False
+
+
 def save_todos(data: dict) -> None:
-    """Safely save todos to YAML using atomic write to prevent corruption."""
+    """Safely save todos to JSON using atomic write to prevent corruption.
+    The written snapshot supersedes the journal, which is removed. If the
+    serialized data is identical to the file already on disk, nothing is
+    rewritten."""
+    memory = _memory_state.get()
+    if memory is not None:
+        with _write_lock:
+            memory["todos"] = _build_index(copy.deepcopy(data))
+        return
+    with _journal_lock():
+        _save_snapshot(data, None)
+
+
+def _save_snapshot(data: dict, todos: Optional[dict]) -> None:
+    """Write data as the new snapshot; see save_todos. todos is passed
+    through to _cache_saved."""
     todo_count = len(data.get("todos", []))
-    logger.debug(f"Saving {todo_count} todos to {TODO_FILE}")
-    logger.debug(f"Data to save: {data}")
+    if _DEBUG:
+        logger.debug("Saving %d todos to %s", todo_count, TODO_FILE)
+        logger.debug("Data to save: %r", data)
     
-    # Ensure parent directory exists
-    TODO_FILE.parent.mkdir(parents=True, exist_ok=True)
-    logger.debug(f"Parent directory {TODO_FILE.parent} exists: {TODO_FILE.parent.exists()}")
+    buf = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    digest = hashlib.blake2b(buf).digest()
+    if _snapshot_unchanged(digest):
+        logger.debug("Todo data unchanged since last save, skipping write")
+        _remove_journal()
+        _cache_saved(_cache["key"], data, digest, todos)
+        return
     
-    # Create temp file in same directory to avoid cross-device issues
-    tmp_fd, tmp_path = tempfile.mkstemp(dir=TODO_FILE.parent)
-    logger.debug(f"Created temp file: {tmp_path}")
+    # Create temp file in same directory to avoid cross-device issues,
+    # creating that directory only if it turns out to be missing. mkstemp
+    # creates it with mode 600 (rw-------), which the rename carries over
+    # to TODO_FILE, so no separate chmod is needed.
+    try:
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=TODO_FILE.parent, prefix=".todos.")
+    except FileNotFoundError:
+        TODO_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=TODO_FILE.parent, prefix=".todos.")
+    logger.debug("Created temp file: %s", tmp_path)
     
     try:
-        with os.fdopen(tmp_fd, "w", encoding="utf-8") as tmp_file:
-            logger.debug("Writing data to temp file")
-            yaml.dump(data, tmp_file)
-            tmp_file.flush()  # Ensure data is written
-            os.fsync(tmp_file.fileno())  # Force write to disk
+        # Write the serialized bytes straight to the descriptor; a buffered
+        # file object would only copy them once more on the way out
+        try:
+            logger.debug("Writing %d bytes to temp file", len(buf))
+            view = memoryview(buf)
+            while view:
+                view = view[os.write(tmp_fd, view):]
+            os.fsync(tmp_fd)  # Force write to disk
+        finally:
+            os.close(tmp_fd)
         
-        logger.debug(f"Temp file size: {os.path.getsize(tmp_path)} bytes")
-        logger.debug(f"Replacing {TODO_FILE} with {tmp_path}")
+        logger.debug("Replacing %s with %s", TODO_FILE, tmp_path)
         os.replace(tmp_path, TODO_FILE)  # atomic rename
-        
-        # Set secure file permissions (600 = rw-------)
-        os.chmod(TODO_FILE, 0o600)
-        final_size = os.path.getsize(TODO_FILE)
-        logger.debug(f"Successfully saved {todo_count} todos with secure permissions")
-        logger.debug(f"Final file size: {final_size} bytes")
-        logger.info(f"Todo file saved successfully: {TODO_FILE} ({final_size} bytes)")
+
+        # The snapshot now includes every journaled change
+        _remove_journal()
+        st = TODO_FILE.stat()
+        _cache_saved(_file_key(st), data, digest, todos)
+        final_size = st.st_size
+        logger.debug("Successfully saved %d todos with secure permissions", todo_count)
+        logger.debug("Final file size: %d bytes", final_size)
+        logger.info("Todo file saved successfully: %s (%d bytes)", TODO_FILE, final_size)
         
     except Exception as e:
-        logger.error(f"Failed to save todos: {e}")
-        logger.error(f"Exception type: {type(e).__name__}")
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
+        logger.exception("Failed to save todos: %s", e)
         # cleanup temp file on error
         try:
             os.unlink(tmp_path)
-            logger.debug(f"Cleaned up temp file: {tmp_path}")
+            logger.debug("Cleaned up temp file: %s", tmp_path)
         except Exception as cleanup_e:
-            logger.debug(f"Failed to cleanup temp file {tmp_path}: {cleanup_e}")
+            logger.debug("Failed to cleanup temp file %s: %s", tmp_path, cleanup_e)
         raise
 
 
+def _dumps(obj) -> str:
+    """Serialize a tool result as indented JSON text."""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+
+
+def new_todo_id() -> str:
+    """Return a UUIDv7 as 32 hex digits: a 48-bit millisecond Unix
+    timestamp followed by 74 random bits, so IDs sort by creation time."""
+    rand = int.from_bytes(secrets.token_bytes(10), "big")
+    value = (
+        (time.time_ns() // 1_000_000) << 80
+        | 0x7 << 76                         # version 7
+        | (rand >> 62 & 0xFFF) << 64        # rand_a
+        | 0b10 << 62                        # RFC 4122 variant
+        | rand & ((1 << 62) - 1)            # rand_b
+    )
+    return f"{value:032x}"
+
+
 def current_timestamp() -> str:
-    """Return system timestamp in ISO 8601 format."""
-    return datetime.now().isoformat(timespec="seconds")
+    """Return system timestamp in ISO 8601 format. Timestamps have second
+    granularity, so the string is formatted once per second and reused."""
+    global _ts_cache
+    now = int(time.time())
+    second, text = _ts_cache
+    if now != second:
+        text = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now))
+        _ts_cache = (now, text)
+    return text
 
 
 # ----------------------------------------------------------------------
@@ -165,185 +846,267 @@ def list_todos() -> List[dict]:
     logger.info("MCP Request: list_todos")
     data = load_todos()
     todo_count = len(data["todos"])
-    logger.info(f"MCP Response: list_todos returned {todo_count} todos")
+    logger.info("MCP Response: list_todos returned %d todos", todo_count)
     return data["todos"]
 
 
+def list_todos_json() -> str:
+    """Return all todos as indented JSON text. The rendering is cached
+    until the todo list changes, so repeated calls skip copying and
+    re-serializing it."""
+    logger.info("MCP Request: list_todos")
+    state = _state()
+    todos = _load_state()
+    rendered = state["list_json"]
+    if rendered is None or rendered[0] is not todos:
+        rendered = (todos, _dumps(list(todos.values())))
+        state["list_json"] = rendered
+    logger.info("MCP Response: list_todos returned %d todos", len(todos))
+    return rendered[1]
+
+
 def add_todo(description: str) -> dict:
     """Add a new todo item with ID, pending status, and created timestamp."""
-    logger.info(f"MCP Request: add_todo(description='{description}')")
-    logger.debug("Loading existing todos")
-    data = load_todos()
-    logger.debug(f"Current todos count before adding: {len(data['todos'])}")
-    
+    logger.info("MCP Request: add_todo(description='%s')", description)
     new_item = {
-        "id": str(uuid.uuid4()),  # unique identifier
+        "id": new_todo_id(),  # time-ordered UUIDv7
         "description": description,
         "status": "pending",
         "created_at": current_timestamp(),
         "completed_at": None
     }
-    logger.debug(f"Created new todo item: {new_item}")
-    
-    data["todos"].append(new_item)
-    logger.debug(f"Todos count after adding: {len(data['todos'])}")
-    logger.debug("About to save todos to file")
-    
-    save_todos(data)
-    logger.info(f"MCP Response: add_todo created todo with ID {new_item['id']}")
+    if _DEBUG:
+        logger.debug("Created new todo item: %s", new_item)
     
-    # Verify the save worked by reloading
-    verification_data = load_todos()
-    logger.debug(f"Verification: reloaded {len(verification_data['todos'])} todos from file")
+    # Load (and migrate a legacy file) before the mutation's lock is taken
+    _load_state()
+    with _journal_lock():
+        todos = dict(_load_state())
+        todos[new_item["id"]] = new_item
+        if _DEBUG:
+            logger.debug("Todos count after adding: %d", len(todos))
+        _publish(todos)
+        _append_journal({"op": "add", "todo": new_item})
+    logger.info("MCP Response: add_todo created todo with ID %s", new_item["id"])
     
-    return new_item
+    return dict(new_item)
 
 
 def complete_todo(id: str) -> Optional[dict]:
     """Mark a todo as completed if found. Returns updated item or None."""
-    logger.info(f"MCP Request: complete_todo(id='{id}')")
-    data = load_todos()
-    for item in data["todos"]:
-        if item["id"] == id:
-            item["status"] = "done"
-            item["completed_at"] = current_timestamp()
-            save_todos(data)
-            logger.info(f"MCP Response: complete_todo marked '{item['description']}' as done")
-            return item
-    logger.warning(f"MCP Response: complete_todo failed - todo with ID '{id}' not found")
+    logger.info("MCP Request: complete_todo(id='%s')", id)
+    # Look the ID up first so a miss never creates the journal
+    item = _load_state().get(id)
+    if item is not None:
+        with _journal_lock():
+            todos = _load_state()
+            item = todos.get(id)
+            if item is not None:
+                item = {**item, "status": "done", "completed_at": current_timestamp()}
+                todos = dict(todos)
+                todos[id] = item
+                _publish(todos)
+                _append_journal({"op": "complete", "id": id, "completed_at": item["completed_at"]})
+    if item is not None:
+        logger.info("MCP Response: complete_todo marked '%s' as done", item["description"])
+        return dict(item)
+    logger.warning("MCP Response: complete_todo failed - todo with ID '%s' not found", id)
     return None
 
 
 def delete_todo(id: str) -> bool:
     """Delete a todo by ID. Returns True if deleted, False otherwise."""
-    logger.info(f"MCP Request: delete_todo(id='{id}')")
-    data = load_todos()
-    before_count = len(data["todos"])
-    
-    # Find the todo being deleted for logging
-    deleted_todo = next((t for t in data["todos"] if t["id"] == id), None)
-    
-    data["todos"] = [t for t in data["todos"] if t["id"] != id]
-    after_count = len(data["todos"])
-    if after_count < before_count:
-        save_todos(data)
-        desc = deleted_todo['description'] if deleted_todo else "unknown"
-        logger.info(f"MCP Response: delete_todo deleted '{desc}' (ID: {id})")
+    logger.info("MCP Request: delete_todo(id='%s')", id)
+    deleted_todo = _load_state().get(id)
+    if deleted_todo is not None:
+        with _journal_lock():
+            todos = _load_state()
+            deleted_todo = todos.get(id)
+            if deleted_todo is not None:
+                todos = dict(todos)
+                del todos[id]
+                _publish(todos)
+                _append_journal({"op": "delete", "id": id})
+    if deleted_todo is not None:
+        logger.info("MCP Response: delete_todo deleted '%s' (ID: %s)", deleted_todo["description"], id)
         return True
-    logger.warning(f"MCP Response: delete_todo failed - todo with ID '{id}' not found")
+    logger.warning("MCP Response: delete_todo failed - todo with ID '%s' not found", id)
     return False
 
 
+def flush_todos() -> int:
+    """Make every change so far durable and visible in TODO_FILE by folding
+    the journal into a fresh snapshot. Returns the number of todos."""
+    logger.info("MCP Request: flush_todos")
+    todos = _load_state()
+    if _memory_state.get() is None and _current_journal_key() is not None:
+        with _journal_lock():
+            todos = _load_state()
+            if _cache["journal_entries"]:
+                _compact()
+            else:
+                # Nothing to fold in; drop the empty journal
+                _remove_journal()
+    logger.info("MCP Response: flush_todos saved %d todos", len(todos))
+    return len(todos)
+
+
 def get_timestamp() -> str:
     """Independent utility to fetch current timestamp."""
     logger.info("MCP Request: get_timestamp")
     timestamp = current_timestamp()
-    logger.info(f"MCP Response: get_timestamp returned {timestamp}")
+    logger.info("MCP Response: get_timestamp returned %s", timestamp)
     return timestamp
 
 
+# Tool definitions never change, so build them once at import time
+_TOOLS = [
+    Tool(
+        name="list_todos",
+        description="List all todo items stored in the JSON file",
+        inputSchema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    Tool(
+        name="add_todo",
+        description="Add a new todo item with system timestamp",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "description": {"type": "string", "description": "Todo description"}
+            },
+            "required": ["description"]
+        }
+    ),
+    Tool(
+        name="complete_todo",
+        description="Mark a todo as completed by ID",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "id": {"type": "string", "description": "Todo item ID"}
+            },
+            "required": ["id"]
+        }
+    ),
+    Tool(
+        name="delete_todo",
+        description="Delete a todo item by ID",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "id": {"type": "string", "description": "Todo item ID"}
+            },
+            "required": ["id"]
+        }
+    ),
+    Tool(
+        name="flush_todos",
+        description="Write all pending todo changes to the todo file immediately",
+        inputSchema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+    Tool(
+        name="get_timestamp",
+        description="Fetch current system timestamp in ISO 8601 format",
+        inputSchema={
+            "type": "object",
+            "properties": {},
+            "required": []
+        }
+    ),
+]
+
+
 @server.list_tools()
 async def handle_list_tools():
     """List available tools"""
-    return [
-        Tool(
-            name="list_todos",
-            description="List all todo items stored in the YAML file",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        ),
-        Tool(
-            name="add_todo",
-            description="Add a new todo item with system timestamp",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "description": {"type": "string", "description": "Todo description"}
-                },
-                "required": ["description"]
-            }
-        ),
-        Tool(
-            name="complete_todo",
-            description="Mark a todo as completed by ID",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "id": {"type": "string", "description": "Todo item ID"}
-                },
-                "required": ["id"]
-            }
-        ),
-        Tool(
-            name="delete_todo",
-            description="Delete a todo item by ID",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "id": {"type": "string", "description": "Todo item ID"}
-                },
-                "required": ["id"]
-            }
-        ),
-        Tool(
-            name="get_timestamp",
-            description="Fetch current system timestamp in ISO 8601 format",
-            inputSchema={
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        ),
-    ]
+    return _TOOLS
+
+
+def _text(text: str) -> List[TextContent]:
+    """Wrap a response in a single TextContent. Every response text is a
+    literal or serializer output, so pydantic validation is skipped."""
+    return [TextContent.model_construct(type="text", text=text)]
+
+
+async def _handle_list(arguments: dict) -> List[TextContent]:
+    """Handle the list_todos tool"""
+    return _text(await asyncio.to_thread(list_todos_json))
+
+
+async def _handle_add(arguments: dict) -> List[TextContent]:
+    """Handle the add_todo tool"""
+    description = arguments.get("description")
+    if not description:
+        logger.warning("add_todo called without description parameter")
+        return _text("Error: description parameter is required")
+    result = await asyncio.to_thread(add_todo, description)
+    if _DEBUG:
+        logger.debug("add_todo returned: %s", result)
+    return _text(_dumps(result))
+
+
+async def _handle_complete(arguments: dict) -> List[TextContent]:
+    """Handle the complete_todo tool"""
+    todo_id = arguments.get("id")
+    if not todo_id:
+        return _text("Error: id parameter is required")
+    result = await asyncio.to_thread(complete_todo, todo_id)
+    if result:
+        return _text(_dumps(result))
+    return _text(f"Error: Todo with ID '{todo_id}' not found")
+
+
+async def _handle_delete(arguments: dict) -> List[TextContent]:
+    """Handle the delete_todo tool"""
+    todo_id = arguments.get("id")
+    if not todo_id:
+        return _text("Error: id parameter is required")
+    if await asyncio.to_thread(delete_todo, todo_id):
+        return _text(f"Todo with ID '{todo_id}' deleted successfully")
+    return _text(f"Error: Todo with ID '{todo_id}' not found")
+
+
+async def _handle_flush(arguments: dict) -> List[TextContent]:
+    """Handle the flush_todos tool"""
+    count = await asyncio.to_thread(flush_todos)
+    return _text(f"Saved {count} todos to {TODO_FILE.name}")
+
+
+async def _handle_timestamp(arguments: dict) -> List[TextContent]:
+    """Handle the get_timestamp tool"""
+    return _text(get_timestamp())
+
+
+# Tool name -> handler coroutine; each handler validates its own arguments.
+# Handlers that touch the todo files run them in a worker thread so file
+# I/O never blocks the event loop; _write_lock keeps those calls consistent.
+_HANDLERS = {
+    "list_todos": _handle_list,
+    "add_todo": _handle_add,
+    "complete_todo": _handle_complete,
+    "delete_todo": _handle_delete,
+    "flush_todos": _handle_flush,
+    "get_timestamp": _handle_timestamp,
+}
+
 
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: dict):
     """Handle tool calls"""
-    logger.debug(f"MCP tool call received: {name} with arguments: {arguments}")
-    
-    if name == "list_todos":
-        result = list_todos()
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
-    
-    elif name == "add_todo":
-        description = arguments.get("description")
-        if not description:
-            logger.warning("add_todo called without description parameter")
-            return [TextContent(type="text", text="Error: description parameter is required")]
-        logger.debug(f"Calling add_todo with description: '{description}'")
-        result = add_todo(description)
-        logger.debug(f"add_todo returned: {result}")
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
-    
-    elif name == "complete_todo":
-        todo_id = arguments.get("id")
-        if not todo_id:
-            return [TextContent(type="text", text="Error: id parameter is required")]
-        result = complete_todo(todo_id)
-        if result:
-            return [TextContent(type="text", text=json.dumps(result, indent=2))]
-        else:
-            return [TextContent(type="text", text=f"Error: Todo with ID '{todo_id}' not found")]
-    
-    elif name == "delete_todo":
-        todo_id = arguments.get("id")
-        if not todo_id:
-            return [TextContent(type="text", text="Error: id parameter is required")]
-        result = delete_todo(todo_id)
-        if result:
-            return [TextContent(type="text", text=f"Todo with ID '{todo_id}' deleted successfully")]
-        else:
-            return [TextContent(type="text", text=f"Error: Todo with ID '{todo_id}' not found")]
-    
-    elif name == "get_timestamp":
-        result = get_timestamp()
-        return [TextContent(type="text", text=result)]
-    
-    else:
-        return [TextContent(type="text", text=f"Error: Unknown tool '{name}'")]
+    if _DEBUG:
+        logger.debug("MCP tool call received: %s with arguments: %s", name, arguments)
+    handler = _HANDLERS.get(name)
+    if handler is None:
+        return _text(f"Error: Unknown tool '{name}'")
+    return await handler(arguments)
 
 
 # ----------------------------------------------------------------------
@@ -355,16 +1118,21 @@ async def main():
     setup_logging()
     logger.info("Todo List Manager MCP Server starting...")
     
-    # Import stdio server utilities
-    from mcp.server.stdio import stdio_server
+    # Load the snapshot and replay the journal once, up front
+    todo_count = len(_load_state())
+    logger.info("Loaded %d todos from %s", todo_count, TODO_FILE)
+    
+    # Last-resort flush of pending journal writes if the process exits
+    # without unwinding the server below
+    atexit.register(flush_journal)
     
-    # Run the MCP server with STDIO transport
+    # Run the MCP server with STDIO transport; journal fsyncs are batched
+    # while it runs and flushed once more on shutdown
     logger.info("MCP server initialized, starting server...")
-    async with stdio_server() as streams:
+    async with deferred_journal_flush(), stdio_server() as streams:
         await server.run(
             streams[0], streams[1], server.create_initialization_options()
         )
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
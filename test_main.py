@@ -4,9 +4,10 @@ Unit tests for Todo List Manager MCP Server
 
 import os
 import tempfile
+import time
 import uuid
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 from unittest import mock
 import pytest
@@ -27,7 +28,7 @@ class TestHelperFunctions:
         """Set up test environment before each test"""
         # Create temporary directory for test files
         self.temp_dir = tempfile.mkdtemp()
-        self.test_file = Path(self.temp_dir) / "test_todos.yaml"
+        self.test_file = Path(self.temp_dir) / "test_todos.json"
         
         # Mock the TODO_FILE to use our test file
         import main
@@ -76,13 +77,119 @@ class TestHelperFunctions:
         }
         
         # Write test data to file
-        import main
+        import json
         with open(self.test_file, "w") as f:
-            main.yaml.dump(test_data, f)
+            json.dump(test_data, f)
         
         result = load_todos()
         assert result == test_data
     
+    def test_load_todos_memory_mapped(self):
+        """Test loading a snapshot large enough to be memory-mapped"""
+        test_data = {"todos": [{"id": "mapped", "description": "Large file"}]}
+        import json
+        with open(self.test_file, "w") as f:
+            json.dump(test_data, f)
+        
+        with mock.patch("main.MMAP_MIN_SIZE", 1):
+            assert load_todos() == test_data
+    
+    def test_load_todos_migrates_legacy_yaml(self):
+        """Test that a legacy YAML todo file is migrated to JSON"""
+        legacy_file = self.test_file.with_suffix(".yaml")
+        legacy_file.write_text(
+            "todos:\n"
+            "  - id: legacy-id\n"
+            "    description: Legacy todo\n"
+            "    status: done\n"
+            "    created_at: 2025-01-01T12:00:00\n"
+            "    completed_at: \"2025-01-01T13:00:00\"\n"
+        )
+        
+        result = load_todos()
+        assert result == {
+            "todos": [
+                {
+                    "id": "legacy-id",
+                    "description": "Legacy todo",
+                    "status": "done",
+                    "created_at": "2025-01-01T12:00:00",
+                    "completed_at": "2025-01-01T13:00:00"
+                }
+            ]
+        }
+        
+        # JSON file was written and is used from now on
+        assert self.test_file.exists()
+        assert load_todos() == result
+    
+    def test_yaml_todo_file_is_read_and_rewritten_as_json(self):
+        """Test that a TODO_FILE configured with a .yaml name keeps working"""
+        import json
+        import main
+        main.TODO_FILE = self.test_file.with_suffix(".yaml")
+        main.TODO_FILE.write_text(
+            "todos:\n"
+            "  - id: yaml-id\n"
+            "    description: Kept in YAML\n"
+            "    status: pending\n"
+            "    created_at: 2025-01-01T12:00:00\n"
+            "    completed_at: null\n"
+        )
+        
+        assert [t["id"] for t in list_todos()] == ["yaml-id"]
+        added = add_todo("Added to a YAML-configured file")
+        main.flush_todos()
+        
+        # The file now holds JSON under its configured name
+        on_disk = json.loads(main.TODO_FILE.read_text())
+        assert [t["id"] for t in on_disk["todos"]] == ["yaml-id", added["id"]]
+        assert on_disk["todos"][0]["created_at"] == "2025-01-01T12:00:00"
+        main._cache["path"] = None
+        assert len(list_todos()) == 2
+    
+    def test_load_todos_rejects_corrupt_file(self):
+        """Test that content that is neither JSON nor YAML todos still fails"""
+        import main
+        for content in ('{"todos": [', "just some text\n"):
+            self.test_file.write_text(content)
+            main._cache["path"] = None
+            with pytest.raises(main.orjson.JSONDecodeError):
+                load_todos()
+    
+    def test_non_todo_file_is_rejected_and_left_alone(self):
+        """Test that an unrelated YAML or JSON file is never overwritten"""
+        import main
+        cases = [
+            (".yaml", "name: my settings\nport: 8080\n", main.orjson.JSONDecodeError),
+            (".json", '{"name": "my settings", "port": 8080}', ValueError),
+        ]
+        for suffix, content, error in cases:
+            main.TODO_FILE = self.test_file.with_suffix(suffix)
+            main.TODO_FILE.write_text(content)
+            main._cache["path"] = None
+            
+            with pytest.raises(error):
+                list_todos()
+            with pytest.raises(error):
+                add_todo("Must not be written")
+            with pytest.raises(error):
+                main.flush_todos()
+            assert main.TODO_FILE.read_text() == content
+        
+        # An unrelated legacy .yaml next to TODO_FILE is not migrated either
+        main.TODO_FILE = self.test_file
+        self.test_file.unlink()
+        self.test_file.with_suffix(".yaml").write_text("name: my settings\n")
+        assert load_todos() == {"todos": []}
+        assert not self.test_file.exists()
+    
+    def test_legacy_yaml_loader_uses_libyaml(self):
+        """Test that legacy YAML is parsed by the libyaml C extension"""
+        import main
+        loader = main._legacy_yaml_loader()
+        assert loader.Parser.__name__ == "CParser"
+    
     def test_save_todos(self):
         """Test saving todos to file"""
         test_data = {
@@ -104,6 +211,93 @@ class TestHelperFunctions:
         loaded_data = load_todos()
         assert loaded_data == test_data
     
+    def test_save_todos_handles_short_writes(self):
+        """Test that a snapshot is written completely even in small chunks"""
+        real_write = os.write
+        test_data = {"todos": [{"id": "short", "description": "Partial writes"}]}
+        
+        with mock.patch("main.os.write", side_effect=lambda fd, data: real_write(fd, data[:7])):
+            save_todos(test_data)
+        
+        import main
+        main._cache["path"] = None
+        assert load_todos() == test_data
+    
+    def test_save_todos_creates_missing_directory(self):
+        """Test that saving creates the todo file's parent directory"""
+        import main
+        main.TODO_FILE = Path(self.temp_dir) / "nested" / "todos.json"
+        
+        save_todos({"todos": []})
+        assert main.TODO_FILE.exists()
+        
+        # Journal appends create the directory as well
+        main.TODO_FILE = Path(self.temp_dir) / "other" / "todos.json"
+        add_todo("Journaled into a new directory")
+        assert main.journal_file().exists()
+    
+    def test_load_todos_returns_copy_of_cache(self):
+        """Test that mutating loaded data does not affect later loads"""
+        save_todos({"todos": [{"id": "a", "description": "Cached", "status": "pending"}]})
+
+        first = load_todos()
+        first["todos"][0]["status"] = "done"
+        first["todos"].append({"id": "b"})
+
+        second = load_todos()
+        assert second == {"todos": [{"id": "a", "description": "Cached", "status": "pending"}]}
+
+    def test_load_todos_detects_external_change(self):
+        """Test that the cache is invalidated when the file changes on disk"""
+        save_todos({"todos": []})
+        assert load_todos() == {"todos": []}
+
+        # Simulate another process rewriting the file
+        import json
+        st = self.test_file.stat()
+        with open(self.test_file, "w") as f:
+            json.dump({"todos": [{"id": "external"}]}, f)
+        os.utime(self.test_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+        assert load_todos() == {"todos": [{"id": "external"}]}
+
+    def test_save_todos_skips_unchanged_data(self):
+        """Test that saving identical data does not rewrite the file"""
+        test_data = {"todos": [{"id": "same", "description": "Unchanged"}]}
+        save_todos(test_data)
+        
+        with mock.patch("main.os.replace") as replace:
+            save_todos({"todos": [{"id": "same", "description": "Unchanged"}]})
+        replace.assert_not_called()
+        
+        # Different content is still written
+        save_todos({"todos": []})
+        assert load_todos() == {"todos": []}
+    
+    def test_save_todos_skips_unchanged_data_after_reload(self):
+        """Test that the skip also applies to a snapshot read from disk"""
+        save_todos({"todos": [{"id": "same", "description": "Unchanged"}]})
+        import main
+        main._cache["path"] = None  # simulate a fresh process
+        load_todos()
+        
+        with mock.patch("main.os.replace") as replace:
+            save_todos({"todos": [{"id": "same", "description": "Unchanged"}]})
+        replace.assert_not_called()
+    
+    def test_load_todos_detects_same_mtime_change(self):
+        """Test that a rewrite within the same mtime tick is detected by size"""
+        save_todos({"todos": []})
+        assert load_todos() == {"todos": []}
+        
+        import json
+        st = self.test_file.stat()
+        with open(self.test_file, "w") as f:
+            json.dump({"todos": [{"id": "same-tick"}]}, f)
+        os.utime(self.test_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+        
+        assert load_todos() == {"todos": [{"id": "same-tick"}]}
+    
     def test_file_permissions(self):
         """Test that saved files have secure permissions (600)"""
         test_data = {"todos": []}
@@ -114,6 +308,17 @@ class TestHelperFunctions:
         file_mode = file_stat.st_mode & 0o777  # Get permission bits
         assert file_mode == 0o600, f"Expected 600 permissions, got {oct(file_mode)}"
     
+    def test_file_permissions_set_at_creation(self):
+        """Test that saves need no chmod, even over a looser existing file"""
+        self.test_file.write_text('{"todos": []}')
+        os.chmod(self.test_file, 0o644)
+        
+        with mock.patch("main.os.chmod") as chmod, mock.patch("main.os.fchmod", create=True) as fchmod:
+            save_todos({"todos": [{"id": "private"}]})
+        chmod.assert_not_called()
+        fchmod.assert_not_called()
+        assert self.test_file.stat().st_mode & 0o777 == 0o600
+    
     def test_current_timestamp_format(self):
         """Test that current_timestamp returns valid ISO format"""
         timestamp = current_timestamp()
@@ -124,6 +329,18 @@ class TestHelperFunctions:
         
         # Should match expected format (no microseconds)
         assert len(timestamp) == 19  # YYYY-MM-DDTHH:MM:SS
+    
+    def test_current_timestamp_cached_per_second(self):
+        """Test that the formatted timestamp is reused within one second"""
+        with mock.patch("main.time.time", return_value=1_700_000_000.2), \
+                mock.patch("main.time.strftime", wraps=time.strftime) as strftime:
+            first = current_timestamp()
+            assert current_timestamp() == first
+            strftime.assert_called_once()
+        
+        with mock.patch("main.time.time", return_value=1_700_000_001.0):
+            second = current_timestamp()
+        assert datetime.fromisoformat(second) - datetime.fromisoformat(first) == timedelta(seconds=1)
 
 
 class TestMCPTools:
@@ -133,7 +350,7 @@ class TestMCPTools:
         """Set up test environment before each test"""
         # Create temporary directory for test files
         self.temp_dir = tempfile.mkdtemp()
-        self.test_file = Path(self.temp_dir) / "test_todos.yaml"
+        self.test_file = Path(self.temp_dir) / "test_todos.json"
         
         # Mock the TODO_FILE to use our test file
         import main
@@ -172,13 +389,28 @@ class TestMCPTools:
         assert result["completed_at"] is None
         
         # Verify UUID format
-        assert isinstance(uuid.UUID(result["id"]), uuid.UUID)
+        assert uuid.UUID(result["id"]).version == 7
         
         # Verify it was saved
         todos = list_todos()
         assert len(todos) == 1
         assert todos[0] == result
     
+    def test_todo_ids_are_time_ordered(self):
+        """Test that IDs are UUIDv7 hex strings ordered by creation time"""
+        import main
+        with mock.patch("main.time.time_ns", return_value=1_700_000_000_000_000_000):
+            first = main.new_todo_id()
+        with mock.patch("main.time.time_ns", return_value=1_700_000_000_001_000_000):
+            second = main.new_todo_id()
+        
+        assert len(first) == 32
+        assert first < second
+        parsed = uuid.UUID(hex=first)
+        assert parsed.version == 7
+        assert parsed.variant == uuid.RFC_4122
+        assert parsed.int >> 80 == 1_700_000_000_000
+    
     def test_add_multiple_todos(self):
         """Test adding multiple todos"""
         descriptions = ["Todo 1", "Todo 2", "Todo 3"]
@@ -241,6 +473,17 @@ class TestMCPTools:
         result = delete_todo(fake_id)
         assert result is False
     
+    def test_failed_lookups_write_nothing(self):
+        """Test that misses and no-op flushes create no files or directories"""
+        import main
+        missing_dir = Path(self.temp_dir) / "x"
+        main.TODO_FILE = missing_dir / "t.json"
+        
+        assert complete_todo("nope") is None
+        assert delete_todo("nope") is False
+        assert main.flush_todos() == 0
+        assert not missing_dir.exists()
+    
     def test_delete_todo_with_multiple(self):
         """Test deleting one todo when multiple exist"""
         # Add multiple todos
@@ -261,6 +504,19 @@ class TestMCPTools:
         assert todo3["id"] in remaining_ids
         assert todo2["id"] not in remaining_ids
     
+    def test_flush_todos(self):
+        """Test that flush_todos folds the journal into the todo file"""
+        import main
+        todo = add_todo("Flushed todo")
+        assert main.journal_file().exists()
+        
+        assert main.flush_todos() == 1
+        assert not main.journal_file().exists()
+        
+        import json
+        with open(self.test_file) as f:
+            assert json.load(f) == {"todos": [todo]}
+    
     def test_get_timestamp(self):
         """Test get_timestamp tool"""
         timestamp = get_timestamp()
@@ -273,6 +529,155 @@ class TestMCPTools:
         now = datetime.now()
         time_diff = abs((now - parsed).total_seconds())
         assert time_diff < 60
+    
+    def test_call_tool_returns_json(self):
+        """Test that tool results are returned as indented JSON text"""
+        import asyncio
+        import json
+        import main
+        
+        added = asyncio.run(main.handle_call_tool("add_todo", {"description": "Via MCP"}))
+        todo = json.loads(added[0].text)
+        assert todo["description"] == "Via MCP"
+        
+        listed = asyncio.run(main.handle_call_tool("list_todos", {}))
+        assert json.loads(listed[0].text) == [todo]
+        assert listed[0].text.startswith("[\n  {")
+    
+    def test_call_tool_runs_concurrently_off_loop(self):
+        """Test that concurrent tool calls run in worker threads and persist"""
+        import asyncio
+        import threading
+        import main
+        threads = set()
+        real_add = main.add_todo
+        
+        def tracking_add(description):
+            threads.add(threading.get_ident())
+            return real_add(description)
+        
+        async def burst():
+            async with main.deferred_journal_flush():
+                await asyncio.gather(*(
+                    main.handle_call_tool("add_todo", {"description": f"Concurrent {i}"})
+                    for i in range(20)
+                ))
+        
+        with mock.patch("main.add_todo", tracking_add):
+            asyncio.run(burst())
+        
+        assert threading.get_ident() not in threads
+        main._cache["path"] = None
+        assert len(list_todos()) == 20
+    
+    def test_list_todos_json_tracks_mutations(self):
+        """Test that the cached list_todos response is refreshed on change"""
+        import json
+        import main
+        
+        todo = add_todo("Cached listing")
+        assert json.loads(main.list_todos_json()) == [todo]
+        assert main.list_todos_json() is main.list_todos_json()
+        
+        completed = complete_todo(todo["id"])
+        assert json.loads(main.list_todos_json()) == [completed]
+        
+        delete_todo(todo["id"])
+        assert json.loads(main.list_todos_json()) == []
+    
+    def test_concurrent_writers_and_readers(self):
+        """Test that threads can add todos while others read the list"""
+        import threading
+        import main
+        errors = []
+        done = threading.Event()
+        
+        def writer(n):
+            try:
+                for i in range(25):
+                    add_todo(f"Writer {n} todo {i}")
+            except Exception as e:
+                errors.append(e)
+        
+        def reader():
+            try:
+                while not done.is_set():
+                    main.orjson.loads(main.list_todos_json())
+                    load_todos()
+            except Exception as e:
+                errors.append(e)
+        
+        readers = [threading.Thread(target=reader) for _ in range(2)]
+        writers = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        done.set()
+        for thread in readers:
+            thread.join()
+        
+        assert errors == []
+        assert len(list_todos()) == 100
+        main._cache["path"] = None
+        assert len(list_todos()) == 100
+    
+    def test_call_tool_errors(self):
+        """Test error responses for unknown tools and missing arguments"""
+        import asyncio
+        import main
+        
+        result = asyncio.run(main.handle_call_tool("no_such_tool", {}))
+        assert result[0].text == "Error: Unknown tool 'no_such_tool'"
+        
+        result = asyncio.run(main.handle_call_tool("add_todo", {}))
+        assert result[0].text == "Error: description parameter is required"
+        
+        result = asyncio.run(main.handle_call_tool("delete_todo", {"id": "missing"}))
+        assert result[0].text == "Error: Todo with ID 'missing' not found"
+
+
+class TestMemoryBackend:
+    """Test the in-memory backend used instead of TODO_FILE"""
+    
+    def setup_method(self):
+        """Switch to an in-memory backend pointed away from any real file"""
+        import contextlib
+        import main
+        self.original_todo_file = main.TODO_FILE
+        main.TODO_FILE = Path(tempfile.gettempdir()) / "unused" / "test_todos.json"
+        self.stack = contextlib.ExitStack()
+        self.stack.enter_context(main.memory_backend())
+    
+    def teardown_method(self):
+        """Restore the file backend"""
+        import main
+        self.stack.close()
+        main.TODO_FILE = self.original_todo_file
+    
+    def test_tools_do_not_touch_disk(self):
+        """Test that every mutation stays in memory"""
+        import main
+        todo = add_todo("In memory")
+        complete_todo(todo["id"])
+        other = add_todo("Deleted")
+        delete_todo(other["id"])
+        main.flush_todos()
+        save_todos({"todos": load_todos()["todos"] + [{"id": "saved"}]})
+        
+        assert [t["id"] for t in list_todos()] == [todo["id"], "saved"]
+        assert list_todos()[0]["status"] == "done"
+        assert not main.TODO_FILE.parent.exists()
+    
+    def test_backend_is_context_local(self):
+        """Test that the backend applies to worker threads and is reset on exit"""
+        import asyncio
+        import json
+        import main
+        with main.memory_backend([{"id": "seed", "description": "Seeded"}]):
+            listed = asyncio.run(main.handle_call_tool("list_todos", {}))
+            assert [t["id"] for t in json.loads(listed[0].text)] == ["seed"]
+        assert list_todos() == []
 
 
 class TestLogging:
@@ -300,6 +705,17 @@ class TestLogging:
             
         assert logger.level == logging.DEBUG
     
+    def test_setup_logging_refreshes_debug_flag(self):
+        """Test that setup_logging records whether DEBUG is enabled"""
+        import main
+        with mock.patch.dict(os.environ, {"LOG_LEVEL": "DEBUG"}):
+            setup_logging()
+        assert main._DEBUG is True
+        
+        with mock.patch.dict(os.environ, {"LOG_LEVEL": "INFO"}):
+            setup_logging()
+        assert main._DEBUG is False
+    
     def test_setup_logging_with_file(self):
         """Test logging setup with file output"""
         with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
@@ -326,11 +742,27 @@ class TestLogging:
             except:
                 pass
     
+    def test_setup_logging_does_not_stack_handlers(self):
+        """Test that repeated setup replaces its own handlers"""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            log_file = os.path.join(temp_dir, "server.log")
+            with mock.patch.dict(os.environ, {"LOG_FILE": log_file}):
+                setup_logging()
+                first = list(logger.handlers)
+                setup_logging()
+            
+            assert len(logger.handlers) == len(first) == 2
+            assert not any(h in first for h in logger.handlers)
+            assert logger.handlers[0].formatter is logger.handlers[1].formatter
+            for handler in logger.handlers:
+                handler.close()
+            logger.handlers.clear()
+    
     def test_logging_in_mcp_functions(self):
         """Test that MCP functions generate appropriate log messages"""
         # Setup temp directory and file for test
         temp_dir = tempfile.mkdtemp()
-        test_file = Path(temp_dir) / "test_todos.yaml"
+        test_file = Path(temp_dir) / "test_todos.json"
         
         # Mock the TODO_FILE to use our test file
         import main
@@ -372,7 +804,7 @@ class TestIntegration:
         """Set up test environment before each test"""
         # Create temporary directory for test files
         self.temp_dir = tempfile.mkdtemp()
-        self.test_file = Path(self.temp_dir) / "test_todos.yaml"
+        self.test_file = Path(self.temp_dir) / "test_todos.json"
         
         # Mock the TODO_FILE to use our test file
         import main
@@ -448,6 +880,195 @@ class TestIntegration:
         reloaded_data = load_todos()
         assert reloaded_data["todos"][0]["status"] == "done"
         assert reloaded_data["todos"][0]["completed_at"] is not None
+    
+    def test_mutations_survive_restart_via_journal(self):
+        """Test that journaled mutations are replayed after a restart"""
+        import main
+        todo1 = add_todo("Journaled todo")
+        todo2 = add_todo("Another journaled todo")
+        completed = complete_todo(todo1["id"])
+        delete_todo(todo2["id"])
+        
+        # Mutations are appended to the journal, not rewritten into the snapshot
+        assert main.journal_file().exists()
+        assert not self.test_file.exists()
+        
+        # Simulate server restart by dropping the in-memory state
+        main._cache["path"] = None
+        todos = load_todos()["todos"]
+        assert len(todos) == 1
+        assert todos[0]["id"] == todo1["id"]
+        assert todos[0]["status"] == "done"
+        assert todos[0]["completed_at"] == completed["completed_at"]
+    
+    def test_journal_stays_open_across_appends(self):
+        """Test that consecutive appends reuse one journal descriptor"""
+        import main
+        with mock.patch("main.os.open", wraps=os.open) as os_open:
+            for i in range(3):
+                add_todo(f"Todo {i}")
+        appends = [c for c in os_open.call_args_list if c.args[1] & os.O_APPEND]
+        assert len(appends) == 1
+        
+        # Compaction closes it and the next append opens a new journal
+        main.flush_todos()
+        assert main._journal_handle["fd"] is None
+        add_todo("After compaction")
+        assert main.journal_file().exists()
+    
+    def test_journal_reopened_after_external_unlink(self):
+        """Test that appends never go to a journal removed behind our back"""
+        import main
+        add_todo("Before removal")
+        os.unlink(main.journal_file())
+        
+        second = add_todo("After removal")
+        assert os.fstat(main._journal_handle["fd"]).st_nlink == 1
+        assert second["id"].encode() in main.journal_file().read_bytes()
+        
+        # Replacing the journal with another file is detected too
+        replacement = main.journal_file().with_suffix(".new")
+        replacement.write_bytes(main.journal_file().read_bytes())
+        os.replace(replacement, main.journal_file())
+        third = add_todo("After replacement")
+        assert third["id"].encode() in main.journal_file().read_bytes()
+    
+    def test_journal_compaction(self):
+        """Test that a long journal is compacted into the snapshot"""
+        import main
+        for i in range(main.JOURNAL_COMPACT_THRESHOLD):
+            add_todo(f"Todo {i}")
+        
+        # Compaction wrote a snapshot and removed the journal
+        assert self.test_file.exists()
+        assert not main.journal_file().exists()
+        
+        main._cache["path"] = None
+        assert len(load_todos()["todos"]) == main.JOURNAL_COMPACT_THRESHOLD
+    
+    def test_journal_compaction_scales_with_todo_count(self):
+        """Test that a large todo list is not rewritten every threshold entries"""
+        import main
+        size = main.JOURNAL_COMPACT_THRESHOLD * 3
+        save_todos({"todos": [{"id": str(i), "description": f"Todo {i}"} for i in range(size)]})
+        
+        for i in range(main.JOURNAL_COMPACT_THRESHOLD):
+            add_todo(f"Extra {i}")
+        assert main.journal_file().exists()
+        
+        # Once the journal is as long as the list, it is folded in
+        for i in range(size // 2):
+            delete_todo(str(i))
+        assert not main.journal_file().exists()
+        main._cache["path"] = None
+        assert len(load_todos()["todos"]) == size - size // 2 + main.JOURNAL_COMPACT_THRESHOLD
+    
+    def test_two_instances_share_one_todo_file(self):
+        """Test that server instances sharing TODO_FILE see each other's
+        changes and never drop them on compaction"""
+        import importlib.util
+        import main
+        
+        def instance(name):
+            spec = importlib.util.spec_from_file_location(name, main.__file__)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.TODO_FILE = self.test_file
+            return module
+        
+        p1, p2 = instance("todo_instance_1"), instance("todo_instance_2")
+        first = p1.add_todo("From instance 1")
+        second = p2.add_todo("From instance 2")
+        
+        # Each instance picks up the other's journaled changes
+        assert [t["id"] for t in p1.list_todos()] == [first["id"], second["id"]]
+        p2.complete_todo(first["id"])
+        p1.delete_todo(second["id"])
+        assert p2.list_todos() == p1.list_todos()
+        assert p2.list_todos()[0]["status"] == "done"
+        
+        # Compaction by one instance keeps the other's entries
+        third = p2.add_todo("Journaled by instance 2")
+        p1.flush_todos()
+        assert not main.journal_file().exists()
+        fourth = p2.add_todo("After compaction")
+        
+        expected = [first["id"], third["id"], fourth["id"]]
+        assert [t["id"] for t in p1.list_todos()] == expected
+        assert [t["id"] for t in instance("todo_instance_3").list_todos()] == expected
+    
+    def test_add_after_migration_with_two_instances(self):
+        """Test that instances adding right after a legacy migration append
+        under the journal lock and keep each other's entries"""
+        import fcntl
+        import importlib.util
+        import main
+        
+        def instance(name):
+            spec = importlib.util.spec_from_file_location(name, main.__file__)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.TODO_FILE = self.test_file
+            return module
+        
+        self.test_file.with_suffix(".yaml").write_text(
+            "todos:\n"
+            "  - id: legacy-id\n"
+            "    description: Legacy todo\n"
+            "    status: pending\n"
+            "    created_at: 2025-01-01T12:00:00\n"
+            "    completed_at: null\n"
+        )
+        
+        def assert_locked(module):
+            # Another open file description must not get the journal lock
+            fd = os.open(module.journal_file(), os.O_RDONLY)
+            try:
+                with pytest.raises(BlockingIOError):
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            finally:
+                os.close(fd)
+        
+        p1, p2 = instance("todo_instance_1"), instance("todo_instance_2")
+        appended = []
+        for module in (p1, p2):
+            real_append = module._append_journal
+            
+            def append(entry, module=module, real_append=real_append):
+                assert_locked(module)
+                real_append(entry)
+                assert_locked(module)
+                appended.append(entry)
+            
+            module._append_journal = append
+        
+        first = p1.add_todo("Added by instance 1")
+        second = p2.add_todo("Added by instance 2")
+        third = p1.add_todo("Added by instance 1 again")
+        assert len(appended) == 3
+        
+        expected = ["legacy-id", first["id"], second["id"], third["id"]]
+        assert main.journal_file().exists()
+        for module in (p1, p2, instance("todo_instance_3")):
+            assert [t["id"] for t in module.list_todos()] == expected
+    
+    def test_deferred_journal_flush_batches_fsync(self):
+        """Test that a burst of mutations shares one journal fsync"""
+        import asyncio
+        import main
+        
+        async def burst():
+            async with main.deferred_journal_flush():
+                for i in range(5):
+                    add_todo(f"Burst todo {i}")
+                await asyncio.sleep(main.JOURNAL_FLUSH_DELAY * 3)
+        
+        with mock.patch("main.os.fsync", wraps=os.fsync) as fsync:
+            asyncio.run(burst())
+        
+        assert fsync.call_count == 1
+        main._cache["path"] = None
+        assert len(load_todos()["todos"]) == 5
 
 
 if __name__ == "__main__":